@@ -6,11 +6,30 @@ from __future__ import annotations
 import re
 import time
 from datetime import datetime, timezone, timedelta
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 # 定义北京时间时区
 BEIJING_TZ = timezone(timedelta(hours=8))
 
+# 合并文本中的连续空白
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# astrbot 上下文角色 -> (角色显示, 昵称, ID)
+_CONTEXT_ROLE_DISPLAY = {
+    "user": ("[用户]", "User", "current_user"),
+    "assistant": ("[助理]", "Assistant", "assistant"),
+}
+_CONTEXT_UNKNOWN_ROLE = ("[未知]", "Unknown", "unknown")
+
+# 无需读取 data 字段的消息段类型 -> 占位文本
+_COMPONENT_PLACEHOLDERS = {
+    "image": "[图片]",
+    "record": "[语音]",
+    "video": "[视频]",
+    "reply": "[回复]",
+    "forward": "[转发消息]",
+}
+
 def format_angelheart_message(message_dict: Dict[str, Any]) -> str:
     """
     将天使之心提供的消息字典格式化为可读文本
@@ -106,23 +125,9 @@ def format_unified_message(message_dict: Dict[str, Any], self_id: str = None) ->
             content_str = message_dict.get("content", "")
 
             # 根据 role 决定角色、昵称和ID，生成统一格式
-            if role == "user":
-                role_display = "[用户]"
-                nickname = "User"
-                sender_id = "current_user"
-            elif role == "assistant":
-                role_display = "[助理]"
-                nickname = "Assistant"
-                sender_id = "assistant"
-            else:
-                role_display = "[未知]"
-                nickname = "Unknown"
-                sender_id = "unknown"
+            role_display, nickname, sender_id = _CONTEXT_ROLE_DISPLAY.get(role, _CONTEXT_UNKNOWN_ROLE)
 
-            # 对于 astrbot 上下文，时间戳通常不存在
-            time_str = ""
-            
-            # 直接拼接并返回，跳过后续通用逻辑
+            # 对于 astrbot 上下文，时间戳通常不存在，直接拼接并返回，跳过后续通用逻辑
             formatted_text = f"{role_display}{nickname}({sender_id}): {content_str}"
             return formatted_text
 
@@ -149,11 +154,11 @@ def format_unified_message(message_dict: Dict[str, Any], self_id: str = None) ->
                     data = component.get("data", {})
                     if comp_type == "text":
                         text_content = data.get("text", "")
-                        text_content = re.sub(r'\s+', ' ', text_content).strip()
+                        text_content = _WHITESPACE_RE.sub(' ', text_content).strip()
                         if text_content:
                             content_parts.append(text_content)
-                    elif comp_type == "image":
-                        content_parts.append("[图片]")
+                    elif comp_type in _COMPONENT_PLACEHOLDERS:
+                        content_parts.append(_COMPONENT_PLACEHOLDERS[comp_type])
                     elif comp_type == "face":
                         face_id = data.get("id", "?")
                         content_parts.append(f"[表情:{face_id}]")
@@ -163,14 +168,6 @@ def format_unified_message(message_dict: Dict[str, Any], self_id: str = None) ->
                             content_parts.append("[@全体成员]")
                         else:
                             content_parts.append(f"[@{target_qq}]")
-                    elif comp_type == "record":
-                        content_parts.append("[语音]")
-                    elif comp_type == "video":
-                        content_parts.append("[视频]")
-                    elif comp_type == "reply":
-                        content_parts.append("[回复]")
-                    elif comp_type == "forward":
-                        content_parts.append("[转发消息]")
                     else:
                         content_parts.append(f"[{comp_type or '未知类型'}]")
             content_str = "".join(content_parts)
@@ -188,3 +185,17 @@ def format_unified_message(message_dict: Dict[str, Any], self_id: str = None) ->
         message_id = message_dict.get('message_id') or message_dict.get('id', 'N/A')
         return f"[格式化错误] 无法处理此消息 (ID: {message_id}, Error: {str(e)})"
 
+
+def format_unified_messages(messages: List[Dict[str, Any]], self_id: Optional[str] = None) -> List[str]:
+    """
+    批量格式化消息列表，逐条结果与 format_unified_message 一致。
+
+    Args:
+        messages (List[Dict]): 消息字典列表。
+        self_id (str, optional): 机器人自身的QQ号，用于区分发言角色。
+
+    Returns:
+        List[str]: 与输入顺序一致的格式化字符串列表。
+    """
+    fmt = format_unified_message
+    return [fmt(message, self_id) for message in messages]
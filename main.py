@@ -47,11 +47,11 @@ class AngelEyePlugin(Star):
             self.context.provider_manager.llm_tools.remove_func(self.qq_history_tool.name)
             logger.info("AngelEyePlugin: QQHistorySearchTool 已取消注册。")
         except Exception as e:
-            logger.warning(f"AngelEyePlugin: 取消注册工具时出错: {e}")
+            logger.warning("AngelEyePlugin: 取消注册工具时出错: %s", e)
         try:
             self.qq_history_tool.history_service.close()
             logger.info("AngelEyePlugin: QQ 历史仓储连接已关闭。")
         except Exception as e:
-            logger.warning(f"AngelEyePlugin: 关闭历史仓储连接时出错: {e}")
+            logger.warning("AngelEyePlugin: 关闭历史仓储连接时出错: %s", e)
 
         logger.info("AngelEyePlugin: 插件已终止。")
@@ -5,7 +5,9 @@ Angel Eye 插件 - QQ 群聊历史仓储层
 
 from __future__ import annotations
 
+import functools
 import json
+import re
 import sqlite3
 import time
 from dataclasses import dataclass
@@ -14,8 +16,20 @@ from typing import Any, Dict, Iterable, List, Optional
 
 from astrbot.core.star.star_tools import StarTools
 
+# orjson 为可选依赖，缺失时回退到标准库 json
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-@dataclass
+
+@functools.lru_cache(maxsize=128)
+def _compile_keyword_pattern(pattern: str) -> "re.Pattern[str]":
+    # 与 SQLite LIKE 语义保持一致：仅 ASCII 字母大小写不敏感
+    return re.compile(pattern, re.IGNORECASE | re.ASCII)
+
+
+@dataclass(slots=True)
 class SyncState:
     group_id: str
     oldest_seq: Optional[int]
@@ -25,15 +39,20 @@ class SyncState:
     last_sync_at: Optional[int]
 
 
-@dataclass
+@dataclass(slots=True)
 class InsertResult:
     inserted_count: int
     page_oldest_anchor: Optional[int]
+    page_min_time: Optional[int]
+    page_max_time: Optional[int]
 
 
 class HistoryRepository:
     """QQ 历史消息 SQLite 仓储。"""
 
+    # 关键词数量达到该阈值时，合并为单个正则匹配，避免逐条 LIKE 重复扫描 search_text
+    _KEYWORD_REGEXP_THRESHOLD = 8
+
     def __init__(self, db_path: Optional[Path] = None):
         default_path = StarTools.get_data_dir("astrbot_plugin_angel_eye") / "qq_history_cache.db"
         self.db_path = db_path or default_path
@@ -44,6 +63,7 @@ class HistoryRepository:
         self._conn.row_factory = sqlite3.Row
         self._conn.execute("PRAGMA journal_mode=WAL")
         self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.create_function("regexp", 2, self._regexp, deterministic=True)
         self._init_schema()
 
     def _init_schema(self) -> None:
@@ -116,6 +136,7 @@ class HistoryRepository:
         covered_from: Optional[int] = None,
         covered_to: Optional[int] = None,
         history_exhausted: Optional[bool] = None,
+        commit: bool = True,
     ) -> None:
         now_ts = int(time.time())
         self._conn.execute(
@@ -157,7 +178,8 @@ class HistoryRepository:
                 now_ts,
             ),
         )
-        self._conn.commit()
+        if commit:
+            self._conn.commit()
 
     def update_coverage_from_messages(self, group_id: str) -> SyncState:
         row = self._conn.execute(
@@ -181,27 +203,42 @@ class HistoryRepository:
 
         return self.get_sync_state(group_id)
 
-    def insert_messages(self, group_id: str, messages: Iterable[Dict[str, Any]]) -> InsertResult:
+    def insert_messages(
+        self,
+        group_id: str,
+        messages: Iterable[Dict[str, Any]],
+        commit: bool = True,
+    ) -> InsertResult:
         payloads: List[tuple] = []
         page_oldest_anchor: Optional[int] = None
+        page_min_time: Optional[int] = None
+        page_max_time: Optional[int] = None
 
         message_list = list(messages)
         if message_list:
-            page_oldest_anchor = self._extract_anchor(message_list[0])
+            page_oldest_anchor = self.extract_anchor(message_list[0])
 
-        for msg in message_list:
-            message_id = str(msg.get("message_id", ""))
-            if not message_id:
-                continue
+        created_at = int(time.time())
 
+        for msg in message_list:
             msg_time = int(msg.get("time", 0) or 0)
             if msg_time <= 0:
                 continue
 
+            # 页时间范围按整页统计（含缺少 message_id 的消息），供同步循环复用
+            if page_min_time is None or msg_time < page_min_time:
+                page_min_time = msg_time
+            if page_max_time is None or msg_time > page_max_time:
+                page_max_time = msg_time
+
+            message_id = str(msg.get("message_id", ""))
+            if not message_id:
+                continue
+
             sender = msg.get("sender", {}) or {}
             user_id = str(sender.get("user_id", "")) or None
             nickname = str(sender.get("nickname", "")) or None
-            message_seq = self._extract_anchor(msg)
+            message_seq = self.extract_anchor(msg)
             search_text = self._build_search_text(msg)
 
             payloads.append(
@@ -213,13 +250,18 @@ class HistoryRepository:
                     user_id,
                     nickname,
                     search_text,
-                    json.dumps(msg, ensure_ascii=False),
-                    int(time.time()),
+                    self._dump_raw_json(msg),
+                    created_at,
                 )
             )
 
         if not payloads:
-            return InsertResult(inserted_count=0, page_oldest_anchor=page_oldest_anchor)
+            return InsertResult(
+                inserted_count=0,
+                page_oldest_anchor=page_oldest_anchor,
+                page_min_time=page_min_time,
+                page_max_time=page_max_time,
+            )
 
         before_changes = self._conn.total_changes
         self._conn.executemany(
@@ -238,9 +280,15 @@ class HistoryRepository:
             """,
             payloads,
         )
-        self._conn.commit()
+        if commit:
+            self._conn.commit()
         inserted_count = self._conn.total_changes - before_changes
-        return InsertResult(inserted_count=inserted_count, page_oldest_anchor=page_oldest_anchor)
+        return InsertResult(
+            inserted_count=inserted_count,
+            page_oldest_anchor=page_oldest_anchor,
+            page_min_time=page_min_time,
+            page_max_time=page_max_time,
+        )
 
     def query_messages(
         self,
@@ -260,6 +308,7 @@ class HistoryRepository:
             keywords=keywords,
             user_ids=user_ids,
         )
+        # 直接迭代游标逐行解码，避免 fetchall 的整批 Row 与解码结果同时驻留内存
         if from_latest:
             rows = self._conn.execute(
                 f"""
@@ -274,7 +323,7 @@ class HistoryRepository:
                 ORDER BY time ASC
                 """,
                 [*params, limit],
-            ).fetchall()
+            )
         else:
             rows = self._conn.execute(
                 f"""
@@ -285,12 +334,13 @@ class HistoryRepository:
                 LIMIT ? OFFSET ?
                 """,
                 [*params, limit, offset],
-            ).fetchall()
+            )
 
+        loads = orjson.loads if orjson is not None else json.loads
         result: List[Dict[str, Any]] = []
         for row in rows:
             try:
-                result.append(json.loads(row["raw_json"]))
+                result.append(loads(row["raw_json"]))
             except json.JSONDecodeError:
                 continue
         return result
@@ -338,6 +388,14 @@ class HistoryRepository:
         except (TypeError, ValueError):
             return None
 
+    def has_messages(self, group_id: str) -> bool:
+        # 只判断是否存在，命中索引首条即返回，无需 COUNT 全量扫描
+        row = self._conn.execute(
+            "SELECT 1 FROM messages WHERE group_id = ? LIMIT 1",
+            (group_id,),
+        ).fetchone()
+        return row is not None
+
     def count_messages(self, group_id: str) -> int:
         row = self._conn.execute(
             "SELECT COUNT(1) AS c FROM messages WHERE group_id = ?",
@@ -362,13 +420,26 @@ class HistoryRepository:
             return None
 
     @staticmethod
-    def _extract_anchor(msg: Dict[str, Any]) -> Optional[int]:
-        return HistoryRepository.extract_anchor(msg)
+    def _dump_raw_json(msg: Dict[str, Any]) -> str:
+        if orjson is not None:
+            try:
+                return orjson.dumps(msg).decode("utf-8")
+            except TypeError:
+                # orjson 不支持超出 64 位的整数与非字符串键，回退到标准库
+                pass
+        return json.dumps(msg, ensure_ascii=False, separators=(",", ":"))
 
     @staticmethod
     def _escape_like_pattern(value: str) -> str:
         return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
 
+    @staticmethod
+    def _regexp(pattern: str, value: Optional[str]) -> bool:
+        # 每行都会回调一次，编译结果按模式缓存
+        if value is None:
+            return False
+        return _compile_keyword_pattern(pattern).search(value) is not None
+
     @staticmethod
     def _build_search_text(msg: Dict[str, Any]) -> str:
         text_parts: List[str] = []
@@ -406,16 +477,22 @@ class HistoryRepository:
 
         if user_ids:
             normalized_user_ids = [str(uid) for uid in user_ids]
-            placeholders = ",".join("?" for _ in normalized_user_ids)
+            placeholders = ",".join("?" * len(normalized_user_ids))
             clauses.append(f"user_id IN ({placeholders})")
             params.extend(normalized_user_ids)
 
         if keywords:
-            keyword_clauses = []
-            for keyword in keywords:
-                keyword_clauses.append("search_text LIKE ? ESCAPE '\\'")
-                escaped_keyword = self._escape_like_pattern(keyword)
-                params.append(f"%{escaped_keyword}%")
-            clauses.append(f"({' OR '.join(keyword_clauses)})")
+            # 去重后再匹配；空关键词命中任意文本，整组条件等价于不过滤
+            keywords = list(dict.fromkeys(keywords))
+            if "" in keywords:
+                keywords = None
+
+        if keywords and len(keywords) >= self._KEYWORD_REGEXP_THRESHOLD:
+            clauses.append("search_text REGEXP ?")
+            params.append("|".join(re.escape(keyword) for keyword in keywords))
+        elif keywords:
+            keyword_clause = "search_text LIKE ? ESCAPE '\\'"
+            clauses.append(f"({' OR '.join([keyword_clause] * len(keywords))})")
+            params.extend(f"%{self._escape_like_pattern(keyword)}%" for keyword in keywords)
 
         return " AND ".join(clauses), params
@@ -13,8 +13,8 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, TYPE_CHECKING
 
 from ..core.exceptions import ResourceBusyError
-from ..core.formatter import format_unified_message
-from .history_repository import HistoryRepository, SyncState
+from ..core.formatter import format_unified_messages
+from .history_repository import HistoryRepository, InsertResult, SyncState
 
 # 导入 logger
 try:
@@ -26,7 +26,7 @@ if TYPE_CHECKING:
     from astrbot.api import Bot
 
 
-@dataclass
+@dataclass(slots=True)
 class FetchConfig:
     max_failures: int = 3
     server_call_delay: float = 0.1
@@ -34,9 +34,10 @@ class FetchConfig:
     default_hours: int = 24
     default_limit: int = 50
     max_limit: int = 500
+    format_in_thread_threshold: int = 32
 
 
-@dataclass
+@dataclass(slots=True)
 class SyncResult:
     direction: str
     pages_fetched: int
@@ -44,7 +45,7 @@ class SyncResult:
     stop_reason: str
 
 
-@dataclass
+@dataclass(slots=True)
 class HistoryQueryResult:
     formatted_messages: List[str]
     total_in_range: int
@@ -81,9 +82,6 @@ class QQChatHistoryService:
         limit: Optional[int] = None,
         slice_expr: Optional[str] = None,
     ) -> HistoryQueryResult:
-        if self.self_id is None:
-            self.self_id = await self._initialize_self_id(bot)
-
         query_start, query_end, query_limit, query_offset, query_from_latest = self._normalize_query_params(
             hours=hours,
             count=count,
@@ -104,19 +102,30 @@ class QQChatHistoryService:
         stop_reasons: List[str] = []
 
         await group_lock.acquire()
+        # 参数校验与忙碌判断都不涉及网络，先于获取机器人ID执行；
+        # 机器人ID仅在格式化阶段使用，与同步过程并发获取
+        self_id_task: Optional[asyncio.Task] = None
+        if self.self_id is None:
+            self_id_task = asyncio.create_task(self._initialize_self_id(bot))
         try:
             initial_state = self.repo.get_sync_state(group_id)
-            head_result = await self._head_fill(bot, group_id, initial_state, query_start)
-            stop_reasons.append(f"head:{head_result.stop_reason}")
-
-            state_after_head = self.repo.update_coverage_from_messages(group_id)
-            needs_tail = state_after_head.covered_from is None or query_start < state_after_head.covered_from
+            if self._determine_coverage_status(query_start, query_end, initial_state) == "FULL":
+                # 仓库数据是连续区间，已完整覆盖查询区间时无需访问 QQ API
+                stop_reasons.append("head:cache_covered")
+                final_state = initial_state
+            else:
+                head_result = await self._head_fill(bot, group_id, initial_state, query_start)
+                stop_reasons.append(f"head:{head_result.stop_reason}")
 
-            if needs_tail:
-                tail_result = await self._tail_fill(bot, group_id, query_start, state_after_head)
-                stop_reasons.append(f"tail:{tail_result.stop_reason}")
+                state_after_head = self.repo.update_coverage_from_messages(group_id)
+                needs_tail = state_after_head.covered_from is None or query_start < state_after_head.covered_from
 
-            final_state = self.repo.update_coverage_from_messages(group_id)
+                final_state = state_after_head
+                if needs_tail:
+                    tail_result = await self._tail_fill(bot, group_id, query_start, state_after_head)
+                    stop_reasons.append(f"tail:{tail_result.stop_reason}")
+                    # 仅尾部填充写入过新数据时才需要重新统计覆盖边界
+                    final_state = self.repo.update_coverage_from_messages(group_id)
 
             local_messages = self.repo.query_messages(
                 group_id=group_id,
@@ -135,10 +144,18 @@ class QQChatHistoryService:
                 keywords=keywords,
                 user_ids=filter_user_ids,
             )
+            if self_id_task is not None:
+                self.self_id = await self_id_task
         finally:
+            if self_id_task is not None and not self_id_task.done():
+                self_id_task.cancel()
             group_lock.release()
 
-        formatted_messages = self._format_messages(local_messages)
+        # 结果较多时在线程中格式化，避免阻塞事件循环
+        if len(local_messages) > self.config.format_in_thread_threshold:
+            formatted_messages = await asyncio.to_thread(self._format_messages, local_messages)
+        else:
+            formatted_messages = self._format_messages(local_messages)
         returned_count = len(formatted_messages)
         remaining_in_range = max(total_in_range - returned_count, 0)
         coverage_status = self._determine_coverage_status(query_start, query_end, final_state)
@@ -268,33 +285,25 @@ class QQChatHistoryService:
         cursor_id = 0
         pages_fetched = 0
         inserted_count = 0
-        consecutive_failures = 0
         stop_reason = "caught_up"
 
-        is_empty_cache = state.covered_to is None or self.repo.count_messages(group_id) == 0
+        is_empty_cache = state.covered_to is None or not self.repo.has_messages(group_id)
 
         while True:
-            try:
-                server_messages = await self._fetch_page(bot, group_id, cursor_id)
-                consecutive_failures = 0
-            except Exception as exc:
-                consecutive_failures += 1
-                logger.error("AngelEye[head]: 群 %s 拉取失败: %s", group_id, exc)
-                if consecutive_failures >= self.config.max_failures:
-                    stop_reason = "failures"
-                    break
-                await asyncio.sleep(1)
-                continue
+            server_messages = await self._fetch_page_with_retry(bot, group_id, cursor_id, "head")
+            if server_messages is None:
+                stop_reason = "failures"
+                break
 
             pages_fetched += 1
             if not server_messages:
                 stop_reason = "empty"
                 break
 
-            page_min_time, page_max_time = self._get_page_time_range(server_messages)
-
-            insert_result = self.repo.insert_messages(group_id, server_messages)
+            # 消息写入与同步状态更新合并为一次提交
+            insert_result = self.repo.insert_messages(group_id, server_messages, commit=False)
             inserted_count += insert_result.inserted_count
+            page_min_time, page_max_time = self._get_page_time_range(insert_result)
 
             self.repo.upsert_sync_state(
                 group_id=group_id,
@@ -310,7 +319,7 @@ class QQChatHistoryService:
                 stop_reason = "caught_up"
                 break
 
-            next_cursor = self.repo.extract_anchor(server_messages[0])
+            next_cursor = insert_result.page_oldest_anchor
             if next_cursor is None:
                 stop_reason = "cursor_missing"
                 break
@@ -355,34 +364,28 @@ class QQChatHistoryService:
 
         pages_fetched = 0
         inserted_count = 0
-        consecutive_failures = 0
         stop_reason = "target_reached"
 
         no_progress_pages = 0
         last_oldest_time = state.covered_from
+        # 持锁期间只有本循环写入该群状态，covered_from 按 upsert 的取小规则在本地同步推进
+        covered_from = state.covered_from
 
         while True:
-            try:
-                server_messages = await self._fetch_page(bot, group_id, cursor_id)
-                consecutive_failures = 0
-            except Exception as exc:
-                consecutive_failures += 1
-                logger.error("AngelEye[tail]: 群 %s 拉取失败: %s", group_id, exc)
-                if consecutive_failures >= self.config.max_failures:
-                    stop_reason = "failures"
-                    break
-                await asyncio.sleep(1)
-                continue
+            server_messages = await self._fetch_page_with_retry(bot, group_id, cursor_id, "tail")
+            if server_messages is None:
+                stop_reason = "failures"
+                break
 
             pages_fetched += 1
             if not server_messages:
                 stop_reason = "empty"
                 break
 
-            page_min_time, page_max_time = self._get_page_time_range(server_messages)
-
-            insert_result = self.repo.insert_messages(group_id, server_messages)
+            # 消息写入与同步状态更新合并为一次提交
+            insert_result = self.repo.insert_messages(group_id, server_messages, commit=False)
             inserted_count += insert_result.inserted_count
+            page_min_time, page_max_time = self._get_page_time_range(insert_result)
 
             self.repo.upsert_sync_state(
                 group_id=group_id,
@@ -391,23 +394,23 @@ class QQChatHistoryService:
                 covered_to=page_max_time,
             )
 
-            refreshed_state = self.repo.get_sync_state(group_id)
-            if refreshed_state.covered_from is not None and refreshed_state.covered_from <= target_start:
+            covered_from = page_min_time if covered_from is None else min(covered_from, page_min_time)
+            if covered_from <= target_start:
                 stop_reason = "target_reached"
                 break
 
-            if insert_result.inserted_count == 0 and refreshed_state.covered_from == last_oldest_time:
+            if insert_result.inserted_count == 0 and covered_from == last_oldest_time:
                 no_progress_pages += 1
             else:
                 no_progress_pages = 0
-                last_oldest_time = refreshed_state.covered_from
+                last_oldest_time = covered_from
 
             if no_progress_pages >= self.config.history_exhausted_no_progress_pages:
                 self.repo.upsert_sync_state(group_id=group_id, history_exhausted=True)
                 stop_reason = "history_exhausted"
                 break
 
-            next_cursor = self.repo.extract_anchor(server_messages[0])
+            next_cursor = insert_result.page_oldest_anchor
             if next_cursor is None or next_cursor == cursor_id:
                 stop_reason = "cursor_stuck"
                 break
@@ -429,6 +432,24 @@ class QQChatHistoryService:
             stop_reason=stop_reason,
         )
 
+    async def _fetch_page_with_retry(
+        self,
+        bot: "Bot",
+        group_id: str,
+        cursor_id: int,
+        direction: str,
+    ) -> Optional[List[Dict]]:
+        """拉取单页，连续失败达到 max_failures 时返回 None。"""
+        max_failures = max(self.config.max_failures, 1)
+        for attempt in range(1, max_failures + 1):
+            try:
+                return await self._fetch_page(bot, group_id, cursor_id)
+            except Exception as exc:
+                logger.error("AngelEye[%s]: 群 %s 拉取失败: %s", direction, group_id, exc)
+                if attempt < max_failures:
+                    await asyncio.sleep(1)
+        return None
+
     async def _fetch_page(self, bot: "Bot", group_id: str, cursor_id: int) -> List[Dict]:
         payload = {
             "group_id": int(group_id),
@@ -451,22 +472,15 @@ class QQChatHistoryService:
         return "PARTIAL"
 
     def _format_messages(self, messages: List[Dict]) -> List[str]:
-        formatted: List[str] = []
-        for msg in messages:
-            try:
-                formatted.append(format_unified_message(msg, self.self_id))
-            except Exception as exc:
-                logger.warning("AngelEye: 格式化单条消息失败: %s", exc)
-        return formatted
+        # format_unified_message 内部已兜底异常，单条失败会返回错误标识而非抛出
+        return format_unified_messages(messages, self.self_id)
 
     def close(self) -> None:
         self.repo.close()
 
     @staticmethod
-    def _get_page_time_range(messages: List[Dict]) -> tuple[int, int]:
-        times = [int(m.get("time", 0) or 0) for m in messages]
-        times = [t for t in times if t > 0]
-        if not times:
+    def _get_page_time_range(insert_result: InsertResult) -> tuple[int, int]:
+        if insert_result.page_min_time is None or insert_result.page_max_time is None:
             now_ts = int(time.time())
             return now_ts, now_ts
-        return min(times), max(times)
+        return insert_result.page_min_time, insert_result.page_max_time
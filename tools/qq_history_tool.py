@@ -7,13 +7,14 @@ from __future__ import annotations
 
 import logging
 from dataclasses import dataclass, field
-from datetime import datetime, timezone, timedelta
+from datetime import datetime
 from typing import List, Optional
 
 from astrbot.api import FunctionTool
 from astrbot.api.event import AstrMessageEvent
 
 from ..core.exceptions import ResourceBusyError
+from ..core.formatter import BEIJING_TZ
 from ..services.qq_history_service import HistoryQueryResult, QQChatHistoryService
 
 # 导入 logger
@@ -22,8 +23,6 @@ try:
 except ImportError:
     logger = logging.getLogger(__name__)
 
-BEIJING_TZ = timezone(timedelta(hours=8))
-
 
 @dataclass
 class QQHistorySearchTool(FunctionTool):